@@ -8,24 +8,79 @@ Created by Cursor AI, modified by Jack-vexel.
 
 import time
 import threading
-import queue
+import collections
 import os
 
+import h26x_nal
+
+
+# Size of the file write buffer
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Flush the file once this many bytes are pending, even if frames keep coming
+FLUSH_THRESHOLD = 4 << 20
+
+# Vectored writes are not available on Windows, fall back to buffered writes there
+HAS_WRITEV = hasattr(os, 'writev')
+
+# Maximum number of buffers passed to one writev() call
+IOV_MAX = 1024
+
+# Page cache hints are only available on some POSIX systems (e.g. Linux)
+HAS_FADVISE = hasattr(os, 'posix_fadvise')
+
+# Drop written file data from page cache every time this many bytes are written
+FADVISE_CHUNK = 4 << 20
+
+
+def _default_io_cpu():
+    """
+    Pick the CPU core for the dump worker thread, the last core this process may run on
+    
+    Returns:
+        int: CPU core index, or None if thread affinity is not supported or only one core is available
+    """
+    if not hasattr(os, 'sched_getaffinity'):
+        return None
+    cpus = os.sched_getaffinity(0)
+    return max(cpus) if len(cpus) > 1 else None
+
+
+# CPU core the dump worker thread is pinned to by default (Linux only)
+DEFAULT_IO_CPU = _default_io_cpu()
+
 
 class Dumph26x:
     """
     A class for dumping H.264 video stream data to file using a separate thread
     """
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, max_batch=64, queue_size=None, cpu=DEFAULT_IO_CPU, hevc=False):
         """
         Initialize Dumph26x with file path
         
         Args:
             file_path (str): Path to the output .h264 file
+            max_batch (int, optional): Maximum number of queued frames written per batch. Defaults to 64.
+            queue_size (int, optional): Maximum number of frames waiting to be written, None for no limit
+                so no frame is ever lost. When set and the queue is full, frames are dropped until the
+                next key frame, so the file stays decodable. Defaults to None.
+            cpu (int, optional): CPU core to pin the dump thread to, None to leave it unpinned.
+                Defaults to DEFAULT_IO_CPU. Ignored on platforms without thread affinity support.
+            hevc (bool, optional): Stream is H.265, used to find key frames when queue_size is set. Defaults to False.
         """
         self.file_path = file_path
-        self.frame_queue = queue.Queue()
+        self.max_batch = min(max_batch, IOV_MAX)
+        self.queue_size = queue_size
+        self.cpu = cpu
+        self.hevc = hevc
+        # Set after a frame was dropped, frames are dropped until the next key frame
+        self._dropping = False
+        self.dropped_frames = 0
+        # Single producer (write_frame) / single consumer (_dump_worker) frame queue,
+        # deque append/popleft are atomic so no lock is needed
+        self.frame_queue = collections.deque()
+        self._not_empty = threading.Event()
         self.stop_event = threading.Event()
         self.dump_thread = None
         self.file_handle = None
@@ -40,6 +95,7 @@ class Dumph26x:
             return
             
         # Create and start the dump thread
+        self._dropping = False
         self.dump_thread = threading.Thread(target=self._dump_worker, daemon=True)
         self.dump_thread.start()
         self.is_running = True
@@ -55,6 +111,8 @@ class Dumph26x:
             
         print(f"Stopping Dumph26x...")
         self.stop_event.set()
+        # Wake up the worker if it is waiting for frames
+        self._not_empty.set()
         
         # Wait for thread to finish
         if self.dump_thread and self.dump_thread.is_alive():
@@ -68,55 +126,171 @@ class Dumph26x:
         Add frame data to the queue for writing
         
         Args:
-            frame_data (bytes): H.264 frame data to write
+            frame_data (bytes-like): H.264 frame data to write. bytes are queued as is,
+                other buffers (bytearray, memoryview) are copied once since the caller may reuse them
         """
-        if self.is_running:
-            try:
-                self.frame_queue.put(frame_data, timeout=10.0)
-            except queue.Full:
-                print(f"Warning: Frame queue is full, dropping frame")
-        else:
+        if not self.is_running:
             print(f"Warning: Dumph26x is not running, frame dropped")
+            return
+            
+        if self.queue_size is not None and not self._accept_frame(frame_data):
+            return
+            
+        if not isinstance(frame_data, bytes):
+            frame_data = bytes(frame_data)
+        self.frame_queue.append(frame_data)
+        # Wake up the worker only if it is waiting for frames
+        if not self._not_empty.is_set():
+            self._not_empty.set()
+            
+    def _accept_frame(self, frame_data):
+        """
+        Check whether a frame fits into the bounded queue, once a frame is dropped
+        all frames are dropped until the next key frame, frames after a gap cannot be decoded
+        
+        Args:
+            frame_data (bytes-like): H.264/H.265 frame data to write
+            
+        Returns:
+            bool: True if the frame should be queued
+        """
+        if len(self.frame_queue) < self.queue_size:
+            if not self._dropping:
+                return True
+            if h26x_nal.is_key_frame(frame_data, self.hevc):
+                print(f"Dumph26x: Resumed at key frame, {self.dropped_frames} frames dropped so far")
+                self._dropping = False
+                return True
+        elif not self._dropping:
+            print(f"Warning: Frame queue is full, dropping frames until the next key frame")
+            self._dropping = True
+        self.dropped_frames += 1
+        return False
             
+    def _drain_batch(self, batch, limit):
+        """
+        Move frames waiting in queue into batch
+        
+        Args:
+            batch (list): List to fill, cleared first
+            limit (int): Maximum number of frames to move
+        """
+        batch.clear()
+        while self.frame_queue and len(batch) < limit:
+            batch.append(self.frame_queue.popleft())
+            
+    def _write_batch(self, batch):
+        """
+        Write a batch of frames to file, with a single writev() syscall where available
+        
+        Args:
+            batch (list): Frame data to write, in order
+            
+        Returns:
+            int: Number of bytes written
+        """
+        size = sum(map(len, batch))
+        if not HAS_WRITEV:
+            # Let the file buffer coalesce small NAL units
+            self.file_handle.writelines(batch)
+            return size
+            
+        fd = self.file_handle.fileno()
+        written = os.writev(fd, batch)
+        if written < size:
+            # Short write, write the rest of the batch
+            remaining = memoryview(b''.join(batch))[written:]
+            while remaining:
+                remaining = remaining[os.write(fd, remaining):]
+        return size
+        
     def _dump_worker(self):
         """
         Worker thread function that writes frames to file
         """
+        # Pin this thread to its own core, so blocking file I/O stays away from decoder/GUI threads
+        if self.cpu is not None and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, {self.cpu})
+            except OSError as e:
+                print(f"Dumph26x: Failed to pin dump thread to CPU {self.cpu}: {e}")
+                
         try:
-            # Open the file for writing
-            self.file_handle = open(self.file_path, 'wb')
+            # Open the file for writing, batches are written by writev() directly when it is available
+            self.file_handle = open(self.file_path, 'wb', buffering=0 if HAS_WRITEV else WRITE_BUFFER_SIZE)
             print(f"Opened H.264/H.265 file for writing: {self.file_path}")
             print("\n")
             
+            # File is written sequentially and never read back, tell the kernel so
+            fd = self.file_handle.fileno()
+            if HAS_FADVISE:
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                except OSError as e:
+                    print(f"Dumph26x: Page cache hint failed: {e}")
+            
             frames_written = 0
+            unflushed_bytes = 0
+            bytes_written = 0
+            advised_bytes = 0
+            dropped_bytes = 0
+            
+            # Batch list is allocated once and reused for every write
+            batch = []
             
             while not self.stop_event.is_set():
-                try:
-                    # Try to get frame data from queue with timeout
-                    frame_data = self.frame_queue.get(timeout=0.1)
-                    frames_written += 1
+                if not self.frame_queue:
+                    # No data in queue, wait for the producer or stop(),
+                    # wake up after a timeout only if there is pending data to flush.
+                    # Check the queue and stop_event again after clear(), a wakeup set before it would be lost
+                    self._not_empty.clear()
+                    if (self.frame_queue or self.stop_event.is_set()
+                            or self._not_empty.wait(timeout=0.1 if unflushed_bytes else None)):
+                        continue
+                    # Still idle after timeout, flush pending data and continue waiting
+                    if unflushed_bytes:
+                        self.file_handle.flush()
+                        unflushed_bytes = 0
+                    continue
                     
-                    # Write frame data to file
-                    self.file_handle.write(frame_data)
-                    self.file_handle.flush()
+                # Drain frames already waiting in queue, so one write covers the whole batch
+                self._drain_batch(batch, self.max_batch)
                     
-                    # Print progress every 100 frames
-                    if frames_written % 100 == 0:
-                        print(f"\nDumph26x: Written {frames_written} frames")
-                        
-                except queue.Empty:
-                    # No data in queue, continue waiting
-                    continue
+                # Write frame data to file
+                size = self._write_batch(batch)
+                bytes_written += size
+                # writev() goes to the file descriptor directly, only the buffered fallback has data to flush
+                if not HAS_WRITEV:
+                    unflushed_bytes += size
+                
+                # Release pages of written data, so the dump does not push other data out of page cache.
+                # DONTNEED drops clean pages and only starts asynchronous writeback of dirty ones, so the advice
+                # covers the new chunk (starts its writeback) and trails one chunk behind (written back by now
+                # and dropped). A forced sync would stall the worker on the disk instead
+                if HAS_FADVISE and bytes_written - advised_bytes >= FADVISE_CHUNK:
+                    try:
+                        os.posix_fadvise(fd, dropped_bytes, bytes_written - dropped_bytes, os.POSIX_FADV_DONTNEED)
+                    except OSError as e:
+                        print(f"Dumph26x: Page cache hint failed: {e}")
+                    dropped_bytes = advised_bytes
+                    advised_bytes = bytes_written
+                
+                # Flush only when too much data is pending
+                if unflushed_bytes >= FLUSH_THRESHOLD:
+                    self.file_handle.flush()
+                    unflushed_bytes = 0
+                
+                # Print progress every 100 frames
+                if (frames_written + len(batch)) // 100 > frames_written // 100:
+                    print(f"\nDumph26x: Written {frames_written + len(batch)} frames")
+                frames_written += len(batch)
                     
-            # Write remaining frames in queue
+            # Write remaining frames in queue, in batches as large as writev() allows
             remaining_frames = 0
-            while not self.frame_queue.empty():
-                try:
-                    frame_data = self.frame_queue.get_nowait()
-                    self.file_handle.write(frame_data)
-                    remaining_frames += 1
-                except queue.Empty:
-                    break
+            while self.frame_queue:
+                self._drain_batch(batch, IOV_MAX)
+                self._write_batch(batch)
+                remaining_frames += len(batch)
                     
             if remaining_frames > 0:
                 print(f"Dumph26x: Written {remaining_frames} remaining frames")
@@ -126,8 +300,13 @@ class Dumph26x:
         except Exception as e:
             print(f"Dumph26x error: {e}")
         finally:
-            # Close the file
+            # Flush, sync and close the file
             if self.file_handle:
+                try:
+                    self.file_handle.flush()
+                    os.fsync(self.file_handle.fileno())
+                except OSError as e:
+                    print(f"Dumph26x error: {e}")
                 self.file_handle.close()
                 self.file_handle = None
                 print(f"Closed H.264/H.265 file: {self.file_path}")
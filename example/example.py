@@ -6,10 +6,21 @@ and receive video and audio streams from SspClient
 import time
 import sys
 import threading
+import collections
+import operator
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import os
 
+# Use orjson to parse camera responses if it is installed, its JSONDecodeError is a subclass of json.JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 import libssp
 from dump_h26x import Dumph26x
 from preview import PreviewH26xWnd
@@ -27,64 +38,148 @@ DEFAULT_CAMERA_IP = "192.168.1.84"
 camera_ip = None
 stream_index = 1
 
-# Status line for video and audio
-video_status = ""
-audio_status = ""
+# SspClient receive buffer size (bytes), sized from the stream bitrate before connecting
+DEFAULT_RECV_BUFFER_SIZE = 0x400000
+MIN_RECV_BUFFER_SIZE = 1 << 20
+MAX_RECV_BUFFER_SIZE = 64 << 20
+recv_buffer_size = DEFAULT_RECV_BUFFER_SIZE
+
+# Extract all H264 data fields in one call instead of one dict lookup per field
+_h264_fields = operator.itemgetter('pts', 'frm_no', 'type', 'len', 'ntp_timestamp', 'data')
+_audio_fields = operator.itemgetter('pts', 'len', 'ntp_timestamp')
+
+# Minimum interval between two status updates (ns), at most 10 updates per second
+STATUS_INTERVAL_NS = 100_000_000
+
+# Latest status fields waiting for the status printer thread,
+# deque append/popleft are atomic and a newer status replaces the one not printed yet
+_status_mailbox = collections.deque(maxlen=1)
+_status_ready = threading.Event()
+_status_thread = None
+
+# ANSI cursor control only makes sense on a terminal, checked once at startup
+_IS_TTY = sys.stdout.isatty()
+
+# Move cursor up two lines and clear the line, then clear the line again before the second status line
+_CURSOR = '\033[2A\033[2K'
+_CLEAR_LINE = '\033[2K'
+# Move cursor up one line (to the audio line) and clear it
+_CURSOR_AUDIO = '\033[1A\033[2K'
+# Move cursor down one line, skips the audio line after rewriting the video line only
+_CURSOR_DOWN = '\033[1B'
 
-# Timestamp of the last video frame
-last_pts = 0
+# Status label of the GUI main window, status is shown there instead of the console when set
+status_label = None
+
+# HTTP session for camera control requests, keeps the connection alive between requests.
+# Failed connection attempts are retried, read timeouts and errors after the request was sent are not,
+# so a slow camera does not block the caller (the GUI slot) for several read timeouts
+_HTTP = requests.Session()
+_HTTP.headers["Connection"] = "keep-alive"
+_HTTP.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=Retry(total=2, read=0, backoff_factor=0.1)))
 
 # Global event for stopping the client thread
 stop_event = threading.Event()
 
 # Global Dumph26x instance for saving H.264 data
 DUMP_FOLDER_NAME = "dump"
+_DUMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), DUMP_FOLDER_NAME)
 h264_dump = None
 
 # Global preview widget instance
 preview_widget = None
 
+# Stream settings reported by the camera, numeric fields are None if missing or not a number
+StreamInfo = collections.namedtuple('StreamInfo', (
+    'index', 'encoder_type', 'bitwidth', 'width', 'height', 'fps', 'sample_unit',
+    'bitrate', 'gop', 'rotation', 'split_duration', 'status',
+))
+
+def _to_int(value):
+    """
+    Convert a stream setting value to int
+    :param value: value from the camera JSON response
+    :return: int or None - converted value, None if it is missing or not a number
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _make_stream_info(result):
+    """
+    Build StreamInfo from the stream setting JSON response, numeric fields are converted once here
+    :param result: dict - decoded JSON response
+    :return: StreamInfo - stream settings
+    """
+    return StreamInfo(
+        index=result.get('streamIndex'),
+        encoder_type=result.get('encoderType', 'N/A'),
+        bitwidth=_to_int(result.get('bitwidth')),
+        width=_to_int(result.get('width')),
+        height=_to_int(result.get('height')),
+        fps=result.get('fps'),
+        sample_unit=result.get('sample_unit'),
+        bitrate=_to_int(result.get('bitrate')),
+        gop=_to_int(result.get('gop_n')),
+        rotation=_to_int(result.get('rotation')),
+        split_duration=_to_int(result.get('splitDuration')),
+        status=result.get('status'),
+    )
+
+# Stream settings printout, fields missing in the camera response are shown as N/A
+_STREAM_SETTINGS_TEMPLATE = (
+    "  Stream Index: {streamIndex}\n"
+    "  Encoder Type: {encoderType}\n"
+    "  Bit Width: {bitwidth}\n"
+    "  Resolution: {width}x{height}\n"
+    "  FPS: {fps}\n"
+    "  Sample Unit: {sample_unit}\n"
+    "  Bitrate: {bitrate} kbps\n"
+    "  GOP: {gop_n}\n"
+    "  Rotation: {rotation}\n"
+    "  Split Duration: {splitDuration} seconds\n"
+    "  Status: {status}"
+)
+
 # query stream status and if it is not idle, return False
 def query_stream_settings(ip, stream_index):
     """
     query stream settings
     :param ip: camera IP address
     :param stream_index: stream index (0 for stream0, 1 for stream1)
-    :return: (bool, dict, str) - (success, stream settings, error message)
+    :return: (bool, StreamInfo, str) - (success, stream settings, error message)
     """
     try:
         url = f"http://{ip}/ctrl/stream_setting?index=stream{stream_index}&action=query"
         print(f"\nQuerying {ip} Stream{stream_index} settings with: {url}")
         
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        result = response.json()
-        print(f"\n{ip} Stream{stream_index} Settings:")
-        print(f"  Stream Index: {result.get('streamIndex', 'N/A')}")
-        print(f"  Encoder Type: {result.get('encoderType', 'N/A')}")
-        print(f"  Bit Width: {result.get('bitwidth', 'N/A')}")
-        print(f"  Resolution: {result.get('width', 'N/A')}x{result.get('height', 'N/A')}")
-        print(f"  FPS: {result.get('fps', 'N/A')}")
-        print(f"  Sample Unit: {result.get('sample_unit', 'N/A')}")
-        print(f"  Bitrate: {result.get('bitrate', 'N/A')} kbps")
-        print(f"  GOP: {result.get('gop_n', 'N/A')}")
-        print(f"  Rotation: {result.get('rotation', 'N/A')}")
-        print(f"  Split Duration: {result.get('splitDuration', 'N/A')} seconds")
-        print(f"  Status: {result.get('status', 'N/A')}")
-        
-        if result.get('status') == 'idle':
-            print(f"  {ip} Stream{stream_index} is idle...")
-            return True, result, ""
-        else:
-            return False, result, f"Stream is not idle, current status: {result.get('status')}"
+        # Each connection attempt times out after 0.5 s, with the two connect retries of _HTTP
+        # an unreachable camera fails after about 1.5 s (plus backoff), a connected camera has 5 s to respond
+        with _HTTP.get(url, timeout=(0.5, 5)) as response:
+            response.raise_for_status()
             
-    except requests.exceptions.RequestException as e:
-        return False, None, f"HTTP request failed: {str(e)}"
+            result = _json_loads(response.content)
+            print(f"\n{ip} Stream{stream_index} Settings:")
+            print(_STREAM_SETTINGS_TEMPLATE.format_map(collections.defaultdict(lambda: 'N/A', result)))
+            
+            stream_info = _make_stream_info(result)
+            if stream_info.status == 'idle':
+                print(f"  {ip} Stream{stream_index} is idle...")
+                return True, stream_info, ""
+            else:
+                return False, stream_info, f"Stream is not idle, current status: {stream_info.status}"
+            
+    except requests.Timeout:
+        return False, None, "HTTP request timed out"
+    except requests.ConnectionError as e:
+        return False, None, f"Cannot connect to camera: {e}"
+    except requests.HTTPError as e:
+        return False, None, f"HTTP error: {e}"
     except json.JSONDecodeError:
         return False, None, "Invalid JSON response"
-    except Exception as e:
-        return False, None, f"Unexpected error: {str(e)}"
+    except requests.RequestException as e:
+        return False, None, f"HTTP request failed: {e}"
 
 def sent_stream_index(ip, stream_index):
     """
@@ -97,90 +192,237 @@ def sent_stream_index(ip, stream_index):
         url = f"http://{ip}/ctrl/set?send_stream=Stream{stream_index}"
         print(f"\nSending request to set Stream{stream_index} with: {url}")
         
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if result.get('code') == 0:
-            print(f"{ip} Stream{stream_index} set successfully, response: {result}")
-            return True, ""
-        else:
-            return False, f"Error code: {result.get('code')}, message: {result.get('msg')}"
+        # Same timeouts as query_stream_settings, about 1.5 s until an unreachable camera fails
+        with _HTTP.get(url, timeout=(0.5, 5)) as response:
+            response.raise_for_status()
+            
+            result = _json_loads(response.content)
+            
+            if result.get('code') == 0:
+                print(f"{ip} Stream{stream_index} set successfully, response: {result}")
+                return True, ""
+            else:
+                return False, f"Error code: {result.get('code')}, message: {result.get('msg')}"
             
-    except requests.exceptions.RequestException as e:
-        return False, f"HTTP request failed: {str(e)}"
+    except requests.Timeout:
+        return False, "HTTP request timed out"
+    except requests.ConnectionError as e:
+        return False, f"Cannot connect to camera: {e}"
+    except requests.HTTPError as e:
+        return False, f"HTTP error: {e}"
     except json.JSONDecodeError:
         return False, "Invalid JSON response"
-    except Exception as e:
-        return False, f"Unexpected error: {str(e)}"
+    except requests.RequestException as e:
+        return False, f"HTTP request failed: {e}"
+
+def _recv_buffer_size(stream_info):
+    """
+    Size the SspClient receive buffer to hold about two seconds of stream data
+    :param stream_info: StreamInfo returned by query_stream_settings, bitrate in kbps
+    :return: int - buffer size in bytes, power of two between MIN_RECV_BUFFER_SIZE and MAX_RECV_BUFFER_SIZE
+    """
+    bitrate_kbps = stream_info.bitrate
+    if bitrate_kbps is None:
+        return DEFAULT_RECV_BUFFER_SIZE
+    
+    # kbps * 1000 / 8 bytes per second, two seconds worth of data
+    size = max(2 * bitrate_kbps * 125, MIN_RECV_BUFFER_SIZE)
+    return min(1 << (size - 1).bit_length(), MAX_RECV_BUFFER_SIZE)
+
+def _make_dump_path(ip, index, encoder_type):
+    """
+    Build the dump file path for a camera stream, create dump folder and remove existing file if needed
+    :param ip: camera IP address
+    :param index: stream index (0 for stream0, 1 for stream1)
+    :param encoder_type: stream encoder type, used as file extension so VLC can play the file
+    :return: str - dump file path
+    """
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    dump_file_name = os.path.join(_DUMP_DIR, f"camera_{ip}_stream{index}_{timestamp}.{encoder_type}")
+    
+    os.makedirs(_DUMP_DIR, exist_ok=True)
+    if os.path.exists(dump_file_name):
+        os.remove(dump_file_name)
+    return dump_file_name
+
+# Streaming style of each stream index
+_STREAM_STYLES = {
+    0: libssp.STREAM_MAIN,
+    1: libssp.STREAM_DEFAULT,
+}
+
+# Readable names of video and audio encoder types
+_VIDEO_ENC = {
+    libssp.VIDEO_ENCODER_H264: "H.264",
+    libssp.VIDEO_ENCODER_H265: "H.265",
+}
+_AUDIO_ENC = {
+    libssp.AUDIO_ENCODER_AAC: "AAC",
+    libssp.AUDIO_ENCODER_PCM: "PCM",
+}
 
 def get_video_encoder_name(encoder_type):
     """
     Convert video encoder type to readable string
     """
-    if encoder_type == libssp.VIDEO_ENCODER_H264:
-        return "H.264"
-    elif encoder_type == libssp.VIDEO_ENCODER_H265:
-        return "H.265"
-    else:
-        return "Unknown"
+    return _VIDEO_ENC.get(encoder_type, "Unknown")
 
 def get_audio_encoder_name(encoder_type):
     """
     Convert audio encoder type to readable string
     """
-    if encoder_type == libssp.AUDIO_ENCODER_AAC:
-        return "AAC"
-    elif encoder_type == libssp.AUDIO_ENCODER_PCM:
-        return "PCM"
-    else:
-        return "Unknown"
+    return _AUDIO_ENC.get(encoder_type, "Unknown")
 
-def update_status():
+def _format_video_status(info):
     """
-    Update and print the status line
+    Format video status line from (frm_no, pts, duration, frame_type, size, ntp_timestamp)
     """
-    # Move cursor up two lines
-    sys.stdout.write('\033[2A')
-    # Clear the two lines
-    sys.stdout.write('\033[2K')
-    # Print new status
-    print(video_status)
-    print(audio_status)
-    sys.stdout.flush()
+    if info is None:
+        return ""
+    frm_no, pts, duration, frame_type, size, ntp_timestamp = info
+    return f"Video: frm_no = {frm_no}, PTS={pts}, interval={duration}ns, type={frame_type}, size={size} bytes, NTP={ntp_timestamp}"
 
-def on_h264_data(data):
+def _format_audio_status(info):
     """
-    Callback function for processing H264 video data
+    Format audio status line from (pts, size, ntp_timestamp)
     """
-    global last_pts, video_status, h264_dump
-    
-    # Calculate frame interval (ns)
-    duration = 0
-    if last_pts > 0:
-        duration = data["pts"] - last_pts
-    last_pts = data["pts"]
+    if info is None:
+        return ""
+    pts, size, ntp_timestamp = info
+    return f"Audio: PTS={pts}, size={size} bytes, NTP={ntp_timestamp}"
+
+def _status_printer():
+    """
+    Worker thread function that prints the status lines, keeps formatting and terminal I/O off the SSP callback thread
+    """
+    # Resolve the write method once for the lifetime of the thread
+    write = sys.stdout.write
     
-    # Update video status
-    video_status = f"Video: frm_no = {data['frm_no']}, PTS={data['pts']}, interval={duration}ns, type={data['type']}, size={data['len']} bytes, NTP={data['ntp_timestamp']}"
-    update_status()
+    # Fields of the status lines shown last, unchanged lines are not formatted nor written again
+    last_video_fields = None
+    last_audio_fields = None
     
-    # Write H.264 data to file using Dumph26x
-    if h264_dump and h264_dump.is_running:
-        h264_dump.write_frame(data['data'])
+    while True:
+        _status_ready.wait()
+        _status_ready.clear()
+        try:
+            video_fields, audio_fields = _status_mailbox.popleft()
+        except IndexError:
+            continue
+        video_changed = video_fields != last_video_fields
+        audio_changed = audio_fields != last_audio_fields
+        if not video_changed and not audio_changed:
+            continue
+        last_video_fields = video_fields
+        last_audio_fields = audio_fields
+        
+        # Show status in GUI, the label must be updated on the Qt main thread
+        if status_label is not None:
+            text = f"{_format_video_status(video_fields)}\n{_format_audio_status(audio_fields)}"
+            QMetaObject.invokeMethod(status_label, "setText", Qt.QueuedConnection, Q_ARG(str, text))
+            continue
+            
+        # Overwrite only the changed status lines with a single write, status is only printed to a terminal
+        # where stdout is line buffered, so the newline flushes it without an explicit flush()
+        if not audio_changed:
+            write(f"{_CURSOR}{_format_video_status(video_fields)}\n{_CURSOR_DOWN}")
+        elif not video_changed:
+            write(f"{_CURSOR_AUDIO}{_format_audio_status(audio_fields)}\n")
+        else:
+            write(f"{_CURSOR}{_format_video_status(video_fields)}\n{_CLEAR_LINE}{_format_audio_status(audio_fields)}\n")
 
-    # Send frame to preview widget
-    if preview_widget:
-        preview_widget.push_frame(data['type'], data['data'])
+def start_status_printer():
+    """
+    Start the status printer thread if it is not running yet
+    """
+    global _status_thread
+    if _status_thread is None:
+        _status_thread = threading.Thread(target=_status_printer, daemon=True)
+        _status_thread.start()
 
-def on_audio_data(data):
+class Status:
     """
-    Callback function for processing audio data
+    Latest video and audio status of the stream, updated by the SSP callbacks,
+    status lines are formatted only when shown by the status printer thread
     """
-    global audio_status
-    audio_status = f"Audio: PTS={data['pts']}, size={data['len']} bytes, NTP={data['ntp_timestamp']}"
-    update_status()
+    __slots__ = ('video', 'audio', 'last_ns')
+    
+    def __init__(self):
+        # Video fields (frm_no, pts, duration, frame_type, size, ntp_timestamp)
+        self.video = None
+        # Audio fields (pts, size, ntp_timestamp)
+        self.audio = None
+        # Time of the last status update (ns)
+        self.last_ns = 0
+        
+    def update(self):
+        """
+        Send the status to the status printer, throttled to one update per STATUS_INTERVAL_NS
+        """
+        # Nowhere to show status, skip it when stdout is redirected and there is no GUI
+        if not _IS_TTY and status_label is None:
+            return
+            
+        now = time.monotonic_ns()
+        if now - self.last_ns < STATUS_INTERVAL_NS:
+            return
+        self.last_ns = now
+        
+        _status_mailbox.append((self.video, self.audio))
+        _status_ready.set()
+            
+    def on_audio_data(self, data):
+        """
+        Callback function for processing audio data
+        """
+        self.audio = _audio_fields(data)
+        self.update()
+
+class H264Sink:
+    """
+    Callback object for processing H264 video data, keeps per-frame state in slots instead of module globals
+    """
+    __slots__ = ('last_pts', 'status', 'dump', 'preview')
+    
+    def __init__(self, status, dump=None, preview=None):
+        """
+        Args:
+            status (Status): Status object to update with video frame fields
+            dump (Dumph26x, optional): Dumph26x instance to write frames to
+            preview (PreviewH26xWnd, optional): Preview widget to send frames to
+        """
+        # Timestamp of the last video frame
+        self.last_pts = 0
+        self.status = status
+        self.dump = dump
+        self.preview = preview
+        
+    def __call__(self, data):
+        """
+        Callback function for processing H264 video data
+        """
+        pts, frm_no, frame_type, size, ntp_timestamp, frame_data = _h264_fields(data)
+        
+        # Calculate frame interval (ns)
+        duration = 0
+        if self.last_pts > 0:
+            duration = pts - self.last_pts
+        self.last_pts = pts
+        
+        # Update video status
+        status = self.status
+        status.video = (frm_no, pts, duration, frame_type, size, ntp_timestamp)
+        status.update()
+        
+        # Write H.264 data to file using Dumph26x
+        # frame_data is an immutable bytes object, dump and preview share it without copying
+        dump = self.dump
+        if dump and dump.is_running:
+            dump.write_frame(frame_data)
+            
+        # Send frame to preview widget
+        if self.preview:
+            self.preview.push_frame(frame_type, frame_data)
 
 def on_meta(video_meta, audio_meta, meta):
     """
@@ -232,7 +474,8 @@ def run_client():
         print("\nNo invalid camera IP, exit")
         return
     
-    if stream_index != 0 and stream_index != 1:
+    stream_style = _STREAM_STYLES.get(stream_index)
+    if stream_style is None:
         print(f"\nInvalid stream index {stream_index}, exit")
         return
     
@@ -247,20 +490,24 @@ def run_client():
         if preview_widget:
             preview_widget.start()
         
+        # Start status printer
+        start_status_printer()
+        
         # Start the client
         print(f"\nConnecting to camera {camera_ip}...")
         
         # Create SSP client
-        # Buffer size set to 4MB, streaming style use STREAM_DEFAULT, it is streaming index 1 by default
-        stream_style = libssp.STREAM_MAIN if stream_index == 0 else libssp.STREAM_DEFAULT
-        client = libssp.SspClient(camera_ip, 0x400000, 9999, stream_style)
+        # Buffer size is sized from stream bitrate, streaming style use STREAM_DEFAULT, it is streaming index 1 by default
+        print(f"Receive buffer size: {recv_buffer_size} bytes")
+        client = libssp.SspClient(camera_ip, recv_buffer_size, 9999, stream_style)
         
         # Enable debug print
         client.set_debug_print(False)
         
         # Set callback functions
-        client.on_h264_data = on_h264_data
-        client.on_audio_data = on_audio_data
+        status = Status()
+        client.on_h264_data = H264Sink(status, h264_dump, preview_widget)
+        client.on_audio_data = status.on_audio_data
         client.on_meta = on_meta
         client.on_disconnected = on_disconnected
         client.on_connected = on_connected
@@ -274,9 +521,12 @@ def run_client():
         print(f"Starting client...")
         client.start()
         
-        # Run until stop signal is received
-        while not stop_event.is_set():
-            time.sleep(1)
+        # Block until stop signal is received, wait returns as soon as the event is set.
+        # On the main thread (CLI) wake up every second, an untimed wait cannot be interrupted
+        # by Ctrl+C on Windows, the GUI client thread waits without any wakeups
+        wait_timeout = 1 if threading.current_thread() is threading.main_thread() else None
+        while not stop_event.wait(timeout=wait_timeout):
+            pass
             
     except Exception as e:
         print(f"Error occurred: {e}")
@@ -302,6 +552,48 @@ def run_client():
             
         print(f"run_client thread closed")
         
+# Connect button style sheets, "Connect" (green) and "Disconnect" (red)
+_STYLE_CONNECT = """
+    QPushButton {
+        background-color: #4caf50;
+        color: white;
+        border: 2px solid #388e3c;
+        border-radius: 5px;
+        font-weight: bold;
+        padding: 5px;
+    }
+    QPushButton:hover {
+        background-color: #66bb6a;
+        border-color: #4caf50;
+    }
+    QPushButton:pressed {
+        background-color: #388e3c;
+        border-color: #2e7d32;
+    }
+"""
+
+_STYLE_DISCONNECT = """
+    QPushButton {
+        background-color: #d32f2f;
+        color: white;
+        border: 2px solid #b71c1c;
+        border-radius: 5px;
+        font-weight: bold;
+        padding: 5px;
+    }
+    QPushButton:hover {
+        background-color: #f44336;
+        border-color: #d32f2f;
+    }
+    QPushButton:pressed {
+        background-color: #b71c1c;
+        border-color: #8e0000;
+    }
+"""
+
+# Alignment of form labels in main window
+_RIGHT_VCENTER = Qt.AlignRight | Qt.AlignVCenter
+
 # GUI main window class
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -330,13 +622,13 @@ class MainWindow(QMainWindow):
         
         # Camera IP label
         ip_label = QLabel("Camera IP:")
-        ip_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        ip_label.setAlignment(_RIGHT_VCENTER)
         ip_label.setMinimumHeight(26)
         labels_layout.addWidget(ip_label)
         
         # Stream Index label
         stream_label = QLabel("Stream Index:")
-        stream_label.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        stream_label.setAlignment(_RIGHT_VCENTER)
         stream_label.setMinimumHeight(26)
         labels_layout.addWidget(stream_label)
         
@@ -416,6 +708,11 @@ class MainWindow(QMainWindow):
         preview_widget = PreviewH26xWnd()
         layout.addWidget(preview_widget)
         
+        # Create status label for video and audio status lines
+        global status_label
+        status_label = QLabel("")
+        layout.addWidget(status_label)
+        
         # Initialize client thread
         self.client_thread = None
         
@@ -424,7 +721,7 @@ class MainWindow(QMainWindow):
         Connect to camera
         """
         # Start connection
-        global camera_ip, stream_index, h264_dump
+        global camera_ip, stream_index, h264_dump, recv_buffer_size
         
         # Get camera IP
         camera_ip = self.ip_input.text()
@@ -454,20 +751,17 @@ class MainWindow(QMainWindow):
             return
         
         # get stream encoder type from streaming info
-        dump_encoder_type = stream_info.get('encoderType', 'N/A')
+        dump_encoder_type = stream_info.encoder_type
+        
+        # size receive buffer from stream bitrate
+        recv_buffer_size = _recv_buffer_size(stream_info)
         
         # Check recording option
         record_option = self.record_checkbox.isChecked()
         if record_option:
             # dump stream data to file using Dumph26x
             # file extension is the same as encoder type, so VLC can play it
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            dump_file_name = os.path.join(os.path.dirname(__file__), DUMP_FOLDER_NAME, f"camera_{camera_ip}_stream{stream_index}_{timestamp}.{dump_encoder_type}")
-            
-            if not os.path.exists(os.path.dirname(dump_file_name)):
-                os.makedirs(os.path.dirname(dump_file_name))
-            if os.path.exists(dump_file_name):
-                os.remove(dump_file_name)
+            dump_file_name = _make_dump_path(camera_ip, stream_index, dump_encoder_type)
             
             h264_dump = Dumph26x(dump_file_name)
             print(f"\nRecording {dump_encoder_type} data to: {dump_file_name}")
@@ -541,44 +835,10 @@ class MainWindow(QMainWindow):
         """
         if connected:
             self.connect_btn.setText("Disconnect")
-            self.connect_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #d32f2f;
-                    color: white;
-                    border: 2px solid #b71c1c;
-                    border-radius: 5px;
-                    font-weight: bold;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #f44336;
-                    border-color: #d32f2f;
-                }
-                QPushButton:pressed {
-                    background-color: #b71c1c;
-                    border-color: #8e0000;
-                }
-            """)
+            self.connect_btn.setStyleSheet(_STYLE_DISCONNECT)
         else:
             self.connect_btn.setText("Connect")
-            self.connect_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #4caf50;
-                    color: white;
-                    border: 2px solid #388e3c;
-                    border-radius: 5px;
-                    font-weight: bold;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #66bb6a;
-                    border-color: #4caf50;
-                }
-                QPushButton:pressed {
-                    background-color: #388e3c;
-                    border-color: #2e7d32;
-                }
-            """)
+            self.connect_btn.setStyleSheet(_STYLE_CONNECT)
 
 # run example with Qt GUI window           
 def run_main_gui():
@@ -598,7 +858,7 @@ def run_main_gui():
         
 # run example with command line
 def run_main_cli():
-    global camera_ip, stream_index, h264_dump
+    global camera_ip, stream_index, h264_dump, recv_buffer_size
     print(f"Please input z-cam camera IP (default: {DEFAULT_CAMERA_IP}):")
     
     # get camera IP from user input
@@ -611,11 +871,14 @@ def run_main_cli():
     print("\nPlease select stream index:")
     print("0. Stream0 (STREAM_MAIN)")
     print("1. Stream1 (STREAM_DEFAULT)")
-    # stream_index = int(input("Enter your choice (0 or 1): "))
-    stream_index = 1
-    stream_choice = input("Enter your choice (1 or 0): ")
-    if not stream_choice and stream_choice == "0":
-        stream_index = 0
+    stream_choice = input("Enter your choice (1 or 0, default: 1): ").strip()
+    if not stream_choice:
+        stream_index = 1
+    elif stream_choice in ("0", "1"):
+        stream_index = int(stream_choice)
+    else:
+        print(f"Invalid stream index {stream_choice}, exit")
+        sys.exit(1)
     
     # query stream settings, if stream is not idle, exit
     success, stream_info, error_msg = query_stream_settings(camera_ip, stream_index)
@@ -630,7 +893,10 @@ def run_main_cli():
         sys.exit(1)
     
     # get stream encoder type from streaming info
-    dump_encoder_type = stream_info.get('encoderType', 'N/A')
+    dump_encoder_type = stream_info.encoder_type
+    
+    # size receive buffer from stream bitrate
+    recv_buffer_size = _recv_buffer_size(stream_info)
     
     # get user input to dump stream data to file or not
     print(f"\nDo you want to dump {dump_encoder_type} stream data to file? (y/n):")
@@ -638,39 +904,23 @@ def run_main_cli():
     if dump_h264 is not None and (dump_h264 == "y" or dump_h264 == "Y"):
         # dump stream data to file using Dumph26x
         # file extension is the same as encoder type, so VLC can play it
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        dump_file_name = os.path.join(os.path.dirname(__file__), DUMP_FOLDER_NAME, f"camera_{camera_ip}_stream{stream_index}_{timestamp}.{dump_encoder_type}")
-        if not os.path.exists(os.path.dirname(dump_file_name)):
-            os.makedirs(os.path.dirname(dump_file_name))   
-        if os.path.exists(dump_file_name):
-            os.remove(dump_file_name)
+        dump_file_name = _make_dump_path(camera_ip, stream_index, dump_encoder_type)
         
         h264_dump = Dumph26x(dump_file_name)
         print(f"\nDumping {dump_encoder_type} data to file: {dump_file_name}")
     else:
         h264_dump = None
 
-    # Create a thread to run ssp client
-    client_thread = threading.Thread(target=run_client)
-    client_thread.daemon = True
-    client_thread.start()
+    # Add two empty lines for status display
+    print("\n\n")
     
     try:
-        # Add two empty lines for status display
-        print("\n\n")
-        
-        # Main thread wait
-        while client_thread.is_alive():
-            time.sleep(1)
-            
+        # Run ssp client on main thread until disconnected or Ctrl+C,
+        # run_client stops the client and releases its resources on the way out
+        run_client()
     except KeyboardInterrupt:
         print("Received Ctrl+C, stopping...")
         stop_event.set()
-        
-        if client_thread.is_alive():
-            print(f"Waiting for client thread to end (timeout 10 seconds)...")
-            client_thread.join(timeout=10)  
-            print(f"Client thread ended")
 
 if __name__ == "__main__":
     # if argument is provided, run as gui or cli
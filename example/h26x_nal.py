@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Helpers for H.264/H.265 Annex-B NAL unit inspection, shared by Dumph26x and DecodeH26x
+"""
+
+
+def is_key_frame(frame_raw_data, hevc=False):
+    """
+    Check whether frame data is a key frame
+    
+    Args:
+        frame_raw_data (bytes): Raw H.264/H.265 frame data (Annex-B)
+        hevc (bool, optional): Data is H.265 instead of H.264. Defaults to False.
+    
+    Returns:
+        bool: True if the first picture (VCL) NAL unit is an IDR/IRAP picture,
+            or the data holds parameter sets and no picture at all
+    """
+    size = len(frame_raw_data)
+    param_set = False
+    
+    # Walk NAL units up to the first picture, skipping AUD, SEI and parameter sets
+    start = frame_raw_data.find(b'\x00\x00\x01')
+    while 0 <= start < size - 3:
+        nal_header = frame_raw_data[start + 3]
+        if hevc:
+            nal_type = (nal_header >> 1) & 0x3F
+            if nal_type < 32:
+                # IRAP picture (BLA/IDR/CRA)
+                return 16 <= nal_type <= 23
+            # VPS/SPS/PPS
+            param_set = param_set or 32 <= nal_type <= 34
+        else:
+            nal_type = nal_header & 0x1F
+            if 1 <= nal_type <= 5:
+                # IDR picture
+                return nal_type == 5
+            # SPS/PPS
+            param_set = param_set or nal_type in (7, 8)
+        start = frame_raw_data.find(b'\x00\x00\x01', start + 3)
+    
+    return param_set
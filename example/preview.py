@@ -6,15 +6,50 @@ Preview module for H.264/H.265 video stream decoding and display
 Contains DecodeH26x and PreviewH26xWnd classes
 """
 
+import os
 import time
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
 import av
+from av.video.reformatter import VideoReformatter
 import numpy as np
 from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QSizePolicy
 from PySide6.QtCore import Qt, Signal, QObject, QTimer
 from PySide6.QtGui import QImage, QPixmap
 
+import h26x_nal
+
+
+# Maximum number of decoder threads. Frame threading delays output by (threads - 1) frames,
+# keep it low for a live preview (7 frames, ~117 ms at 60 fps), FFmpeg also warns above 16 threads
+MAX_DECODE_THREADS = 8
+
+# Pixel formats with an 8-bit luma plane first, shown as is in grayscale mode
+# (high bit depth formats such as yuv420p10le have 16-bit samples and are converted to RGB instead)
+GRAYSCALE_FORMATS = frozenset((
+    'yuv420p', 'yuvj420p', 'yuv422p', 'yuvj422p', 'yuv444p', 'yuvj444p', 'nv12', 'nv21', 'gray',
+))
+
+
+def _put_stop_sentinel(q):
+    """
+    Put None into queue to wake up and stop the worker blocked on it,
+    drop the oldest item if the queue is full
+    
+    Args:
+        q (queue.Queue): Queue the worker reads from
+    """
+    while True:
+        try:
+            q.put_nowait(None)
+            return
+        except queue.Full:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+
 
 class DecodeH26x(QObject):
     """
@@ -25,21 +60,28 @@ class DecodeH26x(QObject):
     # Qt signal for decoded frames
     frame_decoded = Signal(object)  # Emits decoded av.VideoFrame
     
-    def __init__(self, queue_size=30):
+    def __init__(self, queue_size=30, parse_bitstream=False):
         """
         Initialize decoder
         
         Args:
             queue_size (int): Maximum size of the frame queue
+            parse_bitstream (bool, optional): Split pushed data into packets with the FFmpeg parser.
+                Not needed for SSP, which delivers one complete frame per push. Defaults to False.
         """
         super().__init__()
         
         # Initialize decoder
+        self.parse_bitstream = parse_bitstream
         self.codec = None
         self.running = False
         self.stop_event = threading.Event()
         self.decode_thread = None
         
+        # Set when frames were lost (dropped or failed to decode), the next key frame
+        # flushes the decoder so no stale reference or reordering state is kept
+        self._resync = False
+        
         # Frame queue for incoming raw data
         self.frame_queue = queue.Queue(maxsize=queue_size)
         
@@ -61,11 +103,9 @@ class DecodeH26x(QObject):
                 print(f"Failed to initialize codec: {e2}")
                 raise
         
-        # Configure codec options
-        self.codec.options.update({
-            'threads': '1',
-            'thread_type': 'slice'
-        })
+        # Decode with one thread per core up to MAX_DECODE_THREADS, let FFmpeg choose frame and/or slice threading
+        self.codec.thread_count = min(os.cpu_count() or 4, MAX_DECODE_THREADS)
+        self.codec.thread_type = 'AUTO'
         
         # Open codec
         self.codec.open()
@@ -93,6 +133,7 @@ class DecodeH26x(QObject):
         print("Stopping decoder...")
         self.running = False
         self.stop_event.set()
+        _put_stop_sentinel(self.frame_queue)
         
         # Wait for thread to finish
         if self.decode_thread and self.decode_thread.is_alive():
@@ -105,84 +146,144 @@ class DecodeH26x(QObject):
         Push raw frame data to decode queue
         
         Args:
-            frame_type (str): Frame type ('I', 'P', etc.)
+            frame_type (int): Frame type from SspClient (uint32)
             frame_raw_data (bytes): Raw H.264/H.265 frame data
         """
         if not self.running:
             print("Warning: Decoder not running, frame dropped")
             return
             
+        # Create frame info tuple
+        frame_info = (frame_type, frame_raw_data)
         try:
-            # Create frame info tuple
-            frame_info = (frame_type, frame_raw_data)
-            self.frame_queue.put(frame_info, timeout=0.1)
+            self.frame_queue.put_nowait(frame_info)
+            return
         except queue.Full:
+            pass
+            
+        # Queue full, never block the caller (network thread)
+        self._resync = True
+        if not self.is_key_frame(frame_type, frame_raw_data):
             print("Warning: Decode queue full, dropping frame")
+            return
             
+        # Decoder cannot resync without key frames, drop the oldest queued frame instead
+        try:
+            self.frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self.frame_queue.put_nowait(frame_info)
+        except queue.Full:
+            print("Warning: Decode queue full, dropping key frame")
+            
+    def is_key_frame(self, frame_type, frame_raw_data):
+        """
+        Check whether frame data is a key frame
+        
+        Args:
+            frame_type (int): Frame type from SspClient (uint32), not used for the check since libssp
+                does not define its values
+            frame_raw_data (bytes): Raw H.264/H.265 frame data (Annex-B)
+            
+        Returns:
+            bool: True if the first picture (VCL) NAL unit is an IDR/IRAP picture,
+                or the data holds parameter sets and no picture at all
+        """
+        return h26x_nal.is_key_frame(frame_raw_data, self.codec.name == 'hevc')
+        
     def _decode_worker(self):
         """Worker thread for decoding frames"""
         print("Decode worker started")
         
-        while self.running and not self.stop_event.is_set():
+        while True:
+            # Block until frame data arrives, None means stop
+            frame_info = self.frame_queue.get()
+            if frame_info is None:
+                break
+            frame_type, frame_raw_data = frame_info
+            
+            # Decode the frame
             try:
-                # Get frame data from queue with timeout
-                frame_info = self.frame_queue.get(timeout=0.01)
-                frame_type, frame_raw_data = frame_info
-                
-                # Decode the frame
-                try:
-                    packets = self.codec.parse(frame_raw_data)
-                    for packet in packets:
-                        frames = self.codec.decode(packet)
-                        for frame in frames:
-                            # Emit decoded frame
-                            self.frame_decoded.emit(frame)
-                            
-                except Exception as e:
-                    print(f"Decode error: {e}")
+                # Key frame after lost frames, drop what the decoder still holds of the broken GOP
+                if self._resync and self.is_key_frame(frame_type, frame_raw_data):
+                    self.codec.flush_buffers()
+                    self._resync = False
                     
-            except queue.Empty:
-                # No data in queue, continue
-                continue
+                if self.parse_bitstream:
+                    packets = self.codec.parse(frame_raw_data)
+                else:
+                    # Data is one complete frame already, decode it as a single packet
+                    packets = (av.Packet(frame_raw_data),)
+                for packet in packets:
+                    frames = self.codec.decode(packet)
+                    for frame in frames:
+                        # Emit decoded frame
+                        self.frame_decoded.emit(frame)
+                        
             except Exception as e:
-                print(f"Decode worker error: {e}")
+                self._resync = True
+                print(f"Decode error: {e}")
                 
+        # Discard frames still buffered in the decoder, the preview is cleared on stop anyway,
+        # so the next start does not show stale frames of this session
+        self.codec.flush_buffers()
+        
         print("Decode worker stopped")
 
 
 class PreviewH26xWnd(QWidget):
     """
     Qt widget for displaying H.264/H.265 video streams
-    Contains DecodeH26x object and display thread
+    Contains DecodeH26x object, decoded frames are converted on a worker thread and painted on the Qt main thread
     """
     
-    def __init__(self, parent=None):
+    # Emits (QImage, pixel buffer) converted by the conversion worker, delivered to the Qt main thread
+    image_ready = Signal(object)
+    
+    def __init__(self, parent=None, grayscale=False):
         """
         Initialize preview window
         
         Args:
             parent: Parent widget
+            grayscale (bool, optional): Show luma (Y) plane only, skips YUV to RGB conversion. Defaults to False.
         """
         super().__init__(parent)
         
+        self.grayscale = grayscale
+        
+        # Latest converted image and the pixel buffer it is built on (QImage does not own it),
+        # generation is bumped for every new image
+        self._current_image = None
+        self._current_pixels = None
+        self._image_generation = 0
+        self._displayed_generation = 0
+        self._displayed_size = None
+        
         # Initialize UI
         self._init_ui()
         
         # Create decoder
         self.decoder = DecodeH26x()
         
-        # Connect decoder signal to display slot
-        self.decoder.frame_decoded.connect(self._on_frame_decoded)
-        
-        # Display thread and queue
+        # Decoded frames are handed over to the conversion worker through a single pending slot,
+        # at most one conversion is queued at any time and a newer frame replaces the waiting one
         self.display_running = False
-        self.display_thread = None
-        self.display_queue = queue.Queue(maxsize=3)  # Limit to 3 frames
+        self._pending_frame = None
+        self._pending_lock = threading.Lock()
+        self._convert_pool = None
+        self.decoder.frame_decoded.connect(self._on_frame_decoded, Qt.DirectConnection)
+        self.image_ready.connect(self._show_image, Qt.QueuedConnection)
         
-        # Display timer for UI updates
-        # self.display_timer = QTimer()
-        # self.display_timer.timeout.connect(self._update_display)
-        # self.display_timer.start(16)  # ~60 FPS
+        # Reused for every frame (by the single conversion worker only),
+        # keeps the libswscale context instead of creating one per frame
+        self._reformatter = VideoReformatter()
+        
+        # Display timer for UI updates, paints the latest converted image
+        self.display_timer = QTimer()
+        self.display_timer.timeout.connect(self._update_display)
+        self.display_timer.start(16)  # ~60 FPS
         
     def _init_ui(self):
         """Initialize user interface"""
@@ -204,23 +305,24 @@ class PreviewH26xWnd(QWidget):
         layout.addWidget(self.video_label)
         
     def start(self):
-        """Start preview (starts decoder and display thread)"""
+        """Start preview (starts decoder and conversion worker)"""
         if self.display_running:
             print("Preview is already running")
             return
             
+        # Start conversion worker, one thread so frames are converted in order
+        with self._pending_lock:
+            self._pending_frame = None
+            self._convert_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview-convert")
+        self.display_running = True
+        
         # Start decoder
         self.decoder.start()
         
-        # Start display thread
-        self.display_running = True
-        self.display_thread = threading.Thread(target=self._display_worker, daemon=True)
-        self.display_thread.start()
-        
         print("Preview started")
         
     def stop(self):
-        """Stop preview (stops decoder and display thread)"""
+        """Stop preview (stops decoder and conversion worker)"""
         if not self.display_running:
             print("Preview is not running")
             return
@@ -230,15 +332,19 @@ class PreviewH26xWnd(QWidget):
         # Stop decoder
         self.decoder.stop()
         
-        # Stop display thread
+        # Stop conversion worker, waits for the conversion in progress. The pool is cleared under the lock
+        # first, a decode thread still running (join timed out) then skips the submit instead of failing
         self.display_running = False
-        if self.display_thread and self.display_thread.is_alive():
-            self.display_thread.join(timeout=5)
+        with self._pending_lock:
+            convert_pool, self._convert_pool = self._convert_pool, None
+            self._pending_frame = None
+        convert_pool.shutdown(wait=True)
             
         # Clear display
         self.video_label.setText("Waiting for connect to camera and start stream...")
         
         self._current_image = None
+        self._current_pixels = None
         
         print("Preview stopped")
         
@@ -247,14 +353,14 @@ class PreviewH26xWnd(QWidget):
         Push frame data to decoder
         
         Args:
-            frame_type (str): Frame type ('I', 'P', etc.)
+            frame_type (int): Frame type from SspClient (uint32)
             frame_raw_data (bytes): Raw H.264/H.265 frame data
         """
         self.decoder.push_frame(frame_type, frame_raw_data)
         
     def _on_frame_decoded(self, frame):
         """
-        Handle decoded frame from decoder
+        Handle decoded frame from decoder, called on decoder thread
         
         Args:
             frame: Decoded av.VideoFrame
@@ -262,64 +368,84 @@ class PreviewH26xWnd(QWidget):
         if not self.display_running:
             return
             
+        # Replace the waiting frame, submit a conversion only if none is queued yet.
+        # Submit under the lock, so stop() cannot shut the pool down in between
+        with self._pending_lock:
+            if self._convert_pool is None:
+                return
+            if self._pending_frame is None:
+                self._convert_pool.submit(self._convert_frame)
+            self._pending_frame = frame
+            
+    def _convert_frame(self):
+        """Convert the latest decoded frame to a displayable image, called on conversion worker thread"""
+        with self._pending_lock:
+            frame, self._pending_frame = self._pending_frame, None
+        if frame is None or not self.display_running:
+            return
+            
         try:
-            # Add frame to display queue
-            self.display_queue.put(frame, timeout=0.1)
-        except queue.Full:
-            # Queue full, drop frame
-            print("Warning: Display queue full, dropping frame")
+            if self.grayscale and frame.format.name in GRAYSCALE_FORMATS:
+                # Use 8-bit Y plane as is, no colorspace conversion
+                image_format = QImage.Format_Grayscale8
+            else:
+                # Convert frame to RGB24 format, done by libswscale with SIMD
+                frame = self._reformatter.reformat(frame, format='rgb24')
+                image_format = QImage.Format_RGB888
+                
+            # Create QImage on the plane memory directly, row stride (padding included) taken from the plane
+            plane = frame.planes[0]
+            pixels = np.frombuffer(plane, np.uint8)
+            q_image = QImage(pixels.data, frame.width, frame.height, plane.line_size, image_format)
             
-    def _display_worker(self):
-        """Worker thread for converting frames to displayable format"""
-        print("Display worker started")
+            # Hand over to Qt main thread, the buffer travels with the image to keep it alive
+            self.image_ready.emit((q_image, pixels))
         
-        while self.display_running:
-            try:
-                # Get frame from queue
-                frame = self.display_queue.get(timeout=0.01)
-                
-                # Convert frame to RGB24 format
-                try:
-                    rgb_frame = frame.to_ndarray(format='rgb24')
-                    
-                    # Create QImage
-                    height, width, channel = rgb_frame.shape
-                    bytes_per_line = 3 * width
-                    q_image = QImage(rgb_frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-                    
-                    # Store for display update
-                    self._current_image = q_image
-                    
-                    # Update display
-                    self._update_display()
-                    
-                except Exception as e:
-                    print(f"Frame conversion error: {e}")
-                    
-            except queue.Empty:
-                # No frame in queue, continue
-                continue
-            except Exception as e:
-                print(f"Display worker error: {e}")
-                
-        print("Display worker stopped")
+        except Exception as e:
+            print(f"Frame conversion error: {e}")
+            
+    def _show_image(self, image):
+        """
+        Store converted image for display, called on Qt main thread
+        
+        Args:
+            image (tuple): (QImage, pixel buffer) from the conversion worker
+        """
+        if not self.display_running:
+            return
+            
+        # Store for display update, display timer picks it up
+        self._current_image, self._current_pixels = image
+        self._image_generation += 1
         
     def _update_display(self):
         """Update display with current frame (called by timer)"""
-        if hasattr(self, '_current_image') and self._current_image is not None:
-            # Scale image to fit label while maintaining aspect ratio
-            scaled_pixmap = QPixmap.fromImage(self._current_image).scaled(
-                self.video_label.size(),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            self.video_label.setPixmap(scaled_pixmap)
+        current_image = self._current_image
+        if current_image is None:
+            return
+            
+        # Skip if the current frame has been displayed already at the current label size
+        generation = self._image_generation
+        target = self.video_label.size()
+        if generation == self._displayed_generation and target == self._displayed_size:
+            return
+        self._displayed_generation = generation
+        self._displayed_size = target
+        
+        # Scale image to fit label while maintaining aspect ratio,
+        # fast (nearest neighbor) scaling is good enough for a live preview
+        scaled_pixmap = QPixmap.fromImage(current_image).scaled(
+            target,
+            Qt.KeepAspectRatio,
+            Qt.FastTransformation
+        )
+        self.video_label.setPixmap(scaled_pixmap)
             
     def resizeEvent(self, event):
         """Handle widget resize"""
         super().resizeEvent(event)
         # Trigger display update on resize
-        if hasattr(self, '_current_image') and self._current_image is not None:
+        if getattr(self, '_current_image', None) is not None:
             self._update_display()
 
 
@@ -17,6 +17,33 @@ machine = platform.machine()
 # Get absolute path of current directory
 base_dir = os.path.abspath(os.path.dirname(__file__))
 
+# Tune the extension for the build host CPU, only for local builds since the result does not run on other CPUs
+native_build = os.environ.get('PYLIBSSP_NATIVE', '0') == '1'
+
+# List library files found in source and build directories while building
+verbose_build = os.environ.get('PYLIBSSP_VERBOSE', '0') == '1'
+
+
+def _install_lib(src, dst):
+    """
+    Install a prebuilt library file, hard link it where possible instead of copying
+
+    Returns:
+        bool: False if dst is already up to date and nothing was done
+    """
+    try:
+        if os.path.getmtime(dst) >= os.path.getmtime(src):
+            return False
+        os.remove(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        # Different file system, or hard links not supported
+        shutil.copy2(src, dst)
+    return True
+
 
 class CustomInstall(install):
     def run(self):
@@ -44,13 +71,19 @@ class CustomInstall(install):
         target_dir = os.path.join(self.install_lib, 'libssp')
         for dll_file in dll_files:
             src = os.path.join(dll_dir, dll_file)
-            if os.path.exists(src):
-                dst = os.path.join(target_dir, dll_file)
-                shutil.copy2(src, dst)
-                print(f"Copied {dll_file} to {dst}")
+            dst = os.path.join(target_dir, dll_file)
+            try:
+                if _install_lib(src, dst):
+                    print(f"Copied {dll_file} to {dst}")
+            except FileNotFoundError:
+                pass
 
 class BuildExt(build_ext):
     def build_extensions(self):
+        # Build extensions in parallel unless -j/--parallel is given
+        if self.parallel is None:
+            self.parallel = os.cpu_count() or 1
+            
         print("\n=== Build Information ===")
         print(f"Build directory: {self.build_lib}")
         print(f"Package data: {self.distribution.package_data}")
@@ -80,42 +113,39 @@ class BuildExt(build_ext):
             raise ValueError(f"Unsupported system: {system}")
 
         # check library files in source directory
-        if os.path.exists(lib_dir):
+        if not os.path.isdir(lib_dir):
+            print(f"\nLibrary directory not found: {lib_dir}")
+            raise RuntimeError(f"Required library directory not found: {lib_dir}")
+        if verbose_build:
             print(f"\nLibrary files in source directory ({lib_dir}):")
             for file in os.listdir(lib_dir):
                 if file.endswith(lib_ext):
                     print(f"  - {file}")
-        else:
-            print(f"\nLibrary directory not found: {lib_dir}")
-            raise RuntimeError(f"Required library directory not found: {lib_dir}")
 
         # build extension
         build_ext.build_extensions(self)
         
         # check library files in build directory
-        if self.build_lib:
-            build_lib_dir = os.path.join(self.build_lib, 'libssp')
-            if os.path.exists(build_lib_dir):
-                print(f"\nLibrary files in build directory ({build_lib_dir}):")
-                for file in os.listdir(build_lib_dir):
-                    if file.endswith(lib_ext):
-                        print(f"  - {file}")
-            else:
-                print(f"\nBuild directory not found: {build_lib_dir}")
-                raise RuntimeError(f"Failed to create build directory: {build_lib_dir}")
-
-        # copy library files to build directory
-        if not os.path.exists(build_lib_dir):
-            os.makedirs(build_lib_dir)
+        build_lib_dir = os.path.join(self.build_lib, 'libssp')
+        if not os.path.isdir(build_lib_dir):
+            print(f"\nBuild directory not found: {build_lib_dir}")
+            raise RuntimeError(f"Failed to create build directory: {build_lib_dir}")
+        if verbose_build:
+            print(f"\nLibrary files in build directory ({build_lib_dir}):")
+            for file in os.listdir(build_lib_dir):
+                if file.endswith(lib_ext):
+                    print(f"  - {file}")
         
         # copy only specified library files
         for lib_file in lib_files:
             src = os.path.join(lib_dir, lib_file)
-            if os.path.exists(src):
-                dst = os.path.join(build_lib_dir, lib_file)
-                shutil.copy2(src, dst)
-                print(f"Copied {lib_file} to {dst}")
-            else:
+            dst = os.path.join(build_lib_dir, lib_file)
+            try:
+                if _install_lib(src, dst):
+                    print(f"Copied {lib_file} to {dst}")
+                else:
+                    print(f"{lib_file} in {build_lib_dir} is up to date")
+            except FileNotFoundError:
                 print(f"Warning: {lib_file} not found in {lib_dir}")
 
         print("\nBuild completed successfully")
@@ -135,12 +165,16 @@ include_dirs = [
 if system == 'Windows':
     library_dirs = [os.path.join(base_dir, 'lib', 'win_x64_vs2017')]
     libraries = ['libssp']
-    extra_compile_args = ['/EHsc', "/DPYBIND11_DETAILED_ERROR_MESSAGES"]
+    extra_compile_args = ['/EHsc', "/DPYBIND11_DETAILED_ERROR_MESSAGES", '/O2']
+    if native_build:
+        extra_compile_args.append('/arch:AVX2')
     extra_link_args = []
 elif system == 'Linux':
     library_dirs = [os.path.join(base_dir, 'lib', 'linux_x64')]
     libraries = ['libssp']
-    extra_compile_args = ['-std=c++11']
+    extra_compile_args = ['-std=c++11', '-O3', '-fvisibility=hidden']
+    if native_build and machine in ('x86_64', 'AMD64'):
+        extra_compile_args.append('-march=native')
     extra_link_args = []
 elif system == 'Darwin':
     # use mac_arm64 for arm64 architecture
@@ -149,7 +183,9 @@ elif system == 'Darwin':
     else:
         library_dirs = [os.path.join(base_dir, 'lib', 'mac')]
     libraries = ['libssp']
-    extra_compile_args = ['-std=c++11']
+    extra_compile_args = ['-std=c++11', '-O3', '-fvisibility=hidden']
+    if native_build:
+        extra_compile_args.append('-mcpu=apple-m1' if machine == 'arm64' else '-march=native')
     extra_link_args = []
 else:
     raise ValueError(f"Unsupported system: {system}")
@@ -0,0 +1,83 @@
+"""
+Tests for the Dumph26x file writer in example/dump_h26x.py (stdlib only, no camera needed)
+"""
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'example'))
+
+import dump_h26x
+from dump_h26x import Dumph26x
+
+
+def _make_frames(count, seed=0):
+    """Build frames of mixed sizes, every frame has its own content"""
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        size = rng.choice((1, 17, 1000, 4096, 65536, rng.randint(1, 200000)))
+        frames.append(i.to_bytes(4, 'little') + bytes([i & 0xFF]) * size)
+    return frames
+
+
+class TestDumph26x(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, 'dump.h264')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _dump(self, frames):
+        """Write frames as bytes, bytearray and memoryview in turn, return the file contents"""
+        dump = Dumph26x(self.file_path, cpu=None)
+        dump.start()
+        for i, frame in enumerate(frames):
+            if i % 3 == 1:
+                buffer = bytearray(frame)
+                dump.write_frame(buffer)
+                # The caller may reuse its buffer, the queued frame must not change
+                buffer[:] = b'\xff' * len(buffer)
+            elif i % 3 == 2:
+                dump.write_frame(memoryview(frame))
+            else:
+                dump.write_frame(frame)
+        dump.stop()
+
+        self.assertFalse(dump.dump_thread.is_alive())
+        self.assertIsNone(dump.file_handle)
+        with open(self.file_path, 'rb') as f:
+            return f.read()
+
+    def test_mixed_frames_round_trip(self):
+        frames = _make_frames(5002)
+        self.assertEqual(self._dump(frames), b''.join(frames))
+
+    @unittest.skipUnless(dump_h26x.HAS_WRITEV, "os.writev is not available")
+    def test_short_writev(self):
+        real_writev = os.writev
+
+        def short_writev(fd, buffers):
+            # Write only about half of the batch, at most one byte of the last buffer
+            size = sum(map(len, buffers))
+            if size < 2:
+                return real_writev(fd, buffers)
+            return os.write(fd, b''.join(buffers)[:size // 2 + 1])
+
+        frames = _make_frames(500, seed=1)
+        with mock.patch.object(os, 'writev', short_writev):
+            data = self._dump(frames)
+        self.assertEqual(data, b''.join(frames))
+
+    def test_stop_when_idle(self):
+        # Worker waits for frames without timeout, stop() must wake it up and close the file
+        self.assertEqual(self._dump([]), b'')
+
+
+if __name__ == "__main__":
+    unittest.main()
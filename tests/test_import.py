@@ -32,27 +32,29 @@ def on_disconnected():
     print("\nConnection disconnected")
 
 
-try:
-    # Create SspClient instance
-    client = libssp.SspClient(camera_ip, 0x400000, 9999, libssp.STREAM_DEFAULT)
-
-    # Set callback functions
-    client.on_h264_data = on_h264_data
-    client.on_audio_data = on_audio_data
-    client.on_meta = on_meta
-    client.on_disconnected = on_disconnected
-    client.on_connected = on_connected
-
-    # Start client
-    client.start()
-
-    # Keep connection for a while
-    import time
-    time.sleep(5)
-
-    # Stop client
-    client.stop()
-    
-except Exception as e:
-    print(f"Error creating SspClient instance: {e}")
-    exit(1)
+# Only connect when run as a script, importing this module (e.g. test collection) must not touch the network
+if __name__ == "__main__":
+    try:
+        # Create SspClient instance
+        client = libssp.SspClient(camera_ip, 0x400000, 9999, libssp.STREAM_DEFAULT)
+
+        # Set callback functions
+        client.on_h264_data = on_h264_data
+        client.on_audio_data = on_audio_data
+        client.on_meta = on_meta
+        client.on_disconnected = on_disconnected
+        client.on_connected = on_connected
+
+        # Start client
+        client.start()
+
+        # Keep connection for a while
+        import time
+        time.sleep(5)
+
+        # Stop client
+        client.stop()
+        
+    except Exception as e:
+        print(f"Error creating SspClient instance: {e}")
+        exit(1)